@@ -16,17 +16,17 @@ https://github.com/hackebrot/cookiecutter/tree/new-context-format
 """
 import shutil
 
-import collections
+import bisect
+import functools
+import hashlib
 import json
 import logging
 import platform
 import re
-from operator import eq, ge, gt, le, lt, ne
+from operator import eq, ge, gt, le, lt, ne, or_
 from typing import Any, Callable, Dict, Tuple
 
 import click
-from jinja2 import Environment
-from packaging import version
 
 from cookiecutter import __version__
 from cookiecutter.exceptions import IncompatibleVersion, InvalidConfiguration
@@ -34,13 +34,13 @@ from cookiecutter.schema import validate
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_PROMPT = 'Please enter a value for "{variable.name}"'
-
 REGEX_COMPILE_FLAGS = {
     'ascii': re.ASCII,
     'debug': re.DEBUG,
     'ignorecase': re.IGNORECASE,
     'locale': re.LOCALE,
+    'multiline': re.MULTILINE,
+    # misspelled name kept for backwards compatibility
     'mulitline': re.MULTILINE,
     'dotall': re.DOTALL,
     'verbose': re.VERBOSE,
@@ -48,6 +48,52 @@ REGEX_COMPILE_FLAGS = {
 
 op_mapping = {'==': eq, '<=': le, '<': lt, '>=': ge, '>': gt, '!=': ne}
 
+# digests of the json objects that already passed schema validation, kept in
+# insertion order so the oldest entry can be dropped once the cap is reached
+_validated_contexts = {}
+_VALIDATED_CONTEXTS_MAXSIZE = 256
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_validation(pattern: str, flags: int) -> re.Pattern:
+    """Compile a validation regex, caching the result by pattern and flags."""
+    return re.compile(pattern, flags)
+
+
+def _is_plain_json(obj) -> bool:
+    """Check that an object is only made of the types a JSON file decodes to."""
+    if isinstance(obj, dict):
+        return all(type(k) is str and _is_plain_json(v) for k, v in obj.items())
+    if type(obj) is list:
+        return all(_is_plain_json(item) for item in obj)
+    return obj is None or type(obj) in (str, int, float, bool)
+
+
+def _validate_once(json_object: Dict) -> None:
+    """Validate a v2 cookiecutter.json, skipping contents validated before."""
+    if not _is_plain_json(json_object):
+        # values injected from Python (e.g. dates or tuples) can't be told
+        # apart from their JSON twins once dumped, so they are always validated
+        validate(json_object)
+        return
+    content = json.dumps(json_object, sort_keys=True).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in _validated_contexts:
+        return
+    validate(json_object)
+    if len(_validated_contexts) >= _VALIDATED_CONTEXTS_MAXSIZE:
+        del _validated_contexts[next(iter(_validated_contexts))]
+    _validated_contexts[digest] = None
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_version(version_str: str):
+    """Parse a version string, caching the result."""
+    # imported here, packaging is only needed when a template has requirements
+    from packaging import version
+
+    return version.parse(version_str)
+
 
 def _split_version_op(
     version_op: str, default='=='
@@ -67,11 +113,15 @@ def _split_version_op(
     :return: a tuple of (version string, operator string, operator function)
     """
     version_op = version_op.strip()
-    for code, op in op_mapping.items():
-        if version_op.startswith(code):
-            version_str = version_op[len(code) :].strip()  # noqa
-            return version_str, code, op
-    return version_op, default, op_mapping[default]
+    # two character operators must be checked first, '<=' also starts with '<'
+    if version_op.startswith(('==', '<=', '>=', '!=')):
+        code = version_op[:2]
+    elif version_op.startswith(('<', '>')):
+        code = version_op[0]
+    else:
+        return version_op, default, op_mapping[default]
+    version_str = version_op[len(code) :].strip()  # noqa
+    return version_str, code, op_mapping[code]
 
 
 def validate_requirement(requires: str, actual: str, message=None):
@@ -88,12 +138,11 @@ def validate_requirement(requires: str, actual: str, message=None):
     :param message: error message to use when the version check fails
     :raises IncompatibleVersion: if a version check fails
     """
-    # parse version numbers
-    requires_ops = [_split_version_op(s) for s in requires.split(',')]
-    version_actual = version.parse(actual)
-    # check each version
-    for version_str, op_str, op_fun in requires_ops:
-        version_requires = version.parse(version_str)
+    version_actual = _parse_version(actual)
+    # parse and check each version lazily, stopping at the first failure
+    for requirement in requires.split(','):
+        version_str, op_str, op_fun = _split_version_op(requirement)
+        version_requires = _parse_version(version_str)
         if not op_fun(version_actual, version_requires):
             error_text = f"{actual} {op_str} {version_str}"
             if message:
@@ -160,10 +209,7 @@ def prompt_json(variable, default):
 
     def process_json(user_value):
         try:
-            return json.loads(
-                user_value,
-                object_pairs_hook=collections.OrderedDict,
-            )
+            return json.loads(user_value)
         except ValueError:
             # json.decoder.JSONDecodeError raised in Python 3.5, 3.6
             # but it inherits from ValueError which is raised in Python 3.4
@@ -220,19 +266,21 @@ def prompt_yes_no(variable, default):
 
 def prompt_choice(variable, default):
     """Return prompt, default and callback for a choice variable."""
-    choice_map = collections.OrderedDict(
-        (u'{}'.format(i), value) for i, value in enumerate(variable.choices, 1)
-    )
-    choices = choice_map.keys()
+    # the choice lookups are computed once, when the variable is created
+    choice_map = variable._choice_map
+    choices = variable._choice_keys
 
-    prompt = u'\n'.join(
+    prompt = '\n'.join(
         (
             variable.prompt,
-            u'\n'.join([u'{} - {}'.format(*c) for c in choice_map.items()]),
-            u'Choose from {}'.format(u', '.join(choices)),
+            '\n'.join([f'{key} - {value}' for key, value in choice_map.items()]),
+            f"Choose from {', '.join(choices)}",
         )
     )
-    default = str(variable.choices.index(default) + 1)
+    if variable._choice_index is not None:
+        default = variable._choice_index[default]
+    else:
+        default = str(variable.choices.index(default) + 1)
 
     user_choice = click.prompt(
         prompt,
@@ -329,7 +377,8 @@ class Variable(object):
                     to if the yes_no value is False (no). Only has meaning for
                     variables of type 'yes_no'.
             - `validation` -- A string defining a regex to use to validation
-                    user input. Defaults to None.
+                    user input. The whole input must match the regex, as with
+                    `re.fullmatch`. Defaults to None.
             - `validation_msg` -- A string defining an additional message to
                     display if the validation check fails.
             - `validation_flags` -- A list of validation flag names that can be
@@ -346,7 +395,8 @@ class Variable(object):
                         * debug - enabling re.DEBUG
                         * ignorecase - enabling re.IGNORECASE
                         * locale - enabling re.LOCALE
-                        * mulitline - enabling re.MULTILINE
+                        * multiline - enabling re.MULTILINE
+                          (also accepted as the legacy spelling `mulitline`)
                         * dotall - enabling re.DOTALL
                         * verbose - enabling re.VERBOSE
 
@@ -372,7 +422,9 @@ class Variable(object):
         # -- DESCRIPTION -----------------------------------------------------
         self.description = info.get('description')
         # -- PROMPT ----------------------------------------------------------
-        self.prompt = info.get('prompt', DEFAULT_PROMPT.format(variable=self))
+        self.prompt = info.get('prompt')
+        if self.prompt is None:
+            self.prompt = f'Please enter a value for "{self.name}"'
 
         # -- HIDE_INPUT ------------------------------------------------------
         self.hide_input = info.get('hide_input', False)
@@ -411,6 +463,27 @@ class Variable(object):
                     var_name=self.name, default=self.default, choices=self.choices
                 )
             )
+        if self.choices:
+            # lookups used when prompting: number -> choice, choice -> number
+            self._choice_map = {str(i): v for i, v in enumerate(self.choices, 1)}
+            self._choice_keys = list(self._choice_map)
+            self._choice_index = {}
+            try:
+                for key, value in self._choice_map.items():
+                    # like list.index, duplicated choices map to their first position
+                    self._choice_index.setdefault(value, key)
+            except TypeError:
+                # unhashable choices (e.g. dicts) are looked up with list.index
+                self._choice_index = None
+
+        # -- PROMPT AND DESERIALIZE FUNCTIONS --------------------------------
+        if self.var_type not in DESERIALIZERS:
+            raise InvalidConfiguration(
+                f"Variable: {self.name} has an unsupported type '{self.var_type}'"
+            )
+        # which prompt depends of the variable type except if its a choice list
+        self._prompt_fn = prompt_choice if self.choices else PROMPTS[self.var_type]
+        self._deserialize_fn = DESERIALIZERS[self.var_type]
 
         # -- VALIDATION STARTS -----------------------------------------------
         self.validation = info.get('validation')
@@ -420,11 +493,13 @@ class Variable(object):
             self.validation_msg = info.get('validation_msg')
             self.validation_flag_names = info.get('validation_flags', [])
 
-            self.validation_flags = 0
-            for vflag in self.validation_flag_names:
-                self.validation_flags |= REGEX_COMPILE_FLAGS[vflag]
+            self.validation_flags = functools.reduce(
+                or_, (REGEX_COMPILE_FLAGS[f] for f in self.validation_flag_names), 0
+            )
             try:
-                self.validate = re.compile(self.validation, self.validation_flags)
+                self.validate = _compile_validation(
+                    self.validation, self.validation_flags
+                )
             except re.error as e:
                 raise InvalidConfiguration(
                     f"Variable: {self.name} - Validation Setup Error:"
@@ -448,13 +523,19 @@ class Variable(object):
         )
 
     def __str__(self):
-        """Provide a JSON representation of the variable content."""
+        """
+        Provide a JSON representation of the variable content.
+
+        Private attributes (internal lookups and bound functions) are left out.
+        This walks every attribute, so when logging pass the variable as a
+        ``%s`` argument and let logging build the string only if it is emitted.
+        """
         s = [
-            "{key}='{value}'".format(key=key, value=self.__dict__[key])
-            for key in self.__dict__
-            if key != 'info'
+            f"{key}='{value}'"
+            for key, value in vars(self).items()
+            if key != 'info' and not key.startswith('_')
         ]
-        return self.__repr__() + ':\n' + ',\n'.join(s)
+        return f"{self!r}:\n" + ',\n'.join(s)
 
 
 class CookiecutterTemplate:
@@ -480,19 +561,16 @@ class CookiecutterTemplate:
 
         if self.requirements:
             self.cookiecutter_version = self.requirements.get('cookiecutter', None)
-            if self.cookiecutter_version:
-                validate_requirement(
-                    self.cookiecutter_version,
-                    __version__,
-                    "cookiecutter version check failed",
-                )
             self.python_version = self.requirements.get('python')
-            if self.python_version:
-                validate_requirement(
-                    self.python_version,
-                    platform.python_version(),
-                    "Python version check failed",
-                )
+            version_checks = (
+                (self.cookiecutter_version, __version__, "cookiecutter"),
+                (self.python_version, platform.python_version(), "Python"),
+            )
+            for requires, actual, component in version_checks:
+                if requires:
+                    validate_requirement(
+                        requires, actual, f"{component} version check failed"
+                    )
 
         self.variables = [Variable(**v) for v in template["variables"]]
 
@@ -517,6 +595,15 @@ class CookiecutterTemplate:
             yield v
 
 
+@functools.lru_cache(maxsize=None)
+def _get_jinja_env():
+    """Return the Jinja environment shared by every load_context call."""
+    # imported here to keep importing this module cheap
+    from jinja2 import Environment
+
+    return Environment(extensions=['jinja2_time.TimeExtension'])  # nosec
+
+
 def prompt_variable(variable: Variable, verbose: bool):
     """
     Prompt variable value from user in the terminal.
@@ -525,21 +612,15 @@ def prompt_variable(variable: Variable, verbose: bool):
     :param verbose: option for more elaborate display
     :return: the value provided by user
     """
-    if variable.choices:
-        # which prompt depends of the variable type except if its a choice list
-        prompt = prompt_choice
-    else:
-        prompt = PROMPTS[variable.var_type]
-
     if verbose and variable.description:
         click.echo(variable.description)
 
     while True:
-        value = prompt(variable, variable.default)
+        value = variable._prompt_fn(variable, variable.default)
         # if a regex pattern has been used for validation, we repeat the prompting
         # until regex validation patter has been matched
         if variable.validate:
-            if variable.validate.match(value):
+            if variable.validate.fullmatch(value):
                 return value
             else:
                 msg = (
@@ -564,33 +645,55 @@ def load_context(json_object: Dict, no_input=False, verbose=True) -> Dict:
     :param verbose: Emit maximum variable information.
     """
     # checking that the context shell is valid
-    validate(json_object)
+    _validate_once(json_object)
 
     # setting up jinja for rendering dynamical variables
-    env = Environment(extensions=['jinja2_time.TimeExtension'])  # nosec
-    context = collections.OrderedDict({})
+    env = _get_jinja_env()
+    context = {}
+
+    # compiled templates keyed by their source, local to this call
+    templates = {}
 
     def jinja_render(string):
-        template = env.from_string(string)
+        template = templates.get(string)
+        if template is None:
+            template = templates[string] = env.from_string(string)
         return template.render(cookiecutter=context)
 
-    skip_to_variable_name = None
-    for variable in CookiecutterTemplate(**json_object):
+    def render_expr(string):
+        # literal strings render to themselves, no need to involve jinja, except
+        # for line breaks which jinja normalizes (and strips at the very end)
+        if not any(token in string for token in ('{{', '{%', '{#', '\n', '\r')):
+            return string
+        return jinja_render(string)
+
+    variables = list(CookiecutterTemplate(**json_object))
+    # positions of each variable name (in ascending order, names may repeat),
+    # used to jump directly to a skip_to target
+    name_to_indices = {}
+    for index, variable in enumerate(variables):
+        name_to_indices.setdefault(variable.name, []).append(index)
+
+    # for prompt esthetics, the terminal width is looked up only once
+    if verbose:
+        width, _ = shutil.get_terminal_size()
+        separator = '-' * width
+
+    index = 0
+    while index < len(variables):
+        variable = variables[index]
+        index += 1
 
         # checking all scenarios for which this variable should be skipped
-        if skip_to_variable_name and variable.name != skip_to_variable_name:
+        if variable.skip_if and render_expr(variable.skip_if) == 'True':
             continue
-        skip_to_variable_name = None
 
-        if variable.skip_if and jinja_render(variable.skip_if) == 'True':
-            continue
-
-        if variable.do_if and jinja_render(variable.do_if) == 'False':
+        if variable.do_if and render_expr(variable.do_if) == 'False':
             continue
 
         # rendering dynamical default value
         if isinstance(variable.default, str):
-            variable.default = jinja_render(variable.default)
+            variable.default = render_expr(variable.default)
 
         # actually getting the variable value
         if no_input or (not variable.prompt_user):
@@ -598,26 +701,33 @@ def load_context(json_object: Dict, no_input=False, verbose=True) -> Dict:
         else:
             value = prompt_variable(variable, verbose)
 
-        deserialize = DESERIALIZERS[variable.var_type]
-        context[variable.name] = deserialize(value)
+        context[variable.name] = variable._deserialize_fn(value)
 
         # for prompt esthetics
         if verbose:
-            width, _ = shutil.get_terminal_size()
-            click.echo('-' * width)
+            click.echo(separator)
 
-        # updating the skipping variables for the continuation
+        # jumping forward to the skip_to variable, if any
+        skip_to_variable_name = None
         if variable.if_yes_skip_to and context[variable.name] is True:
             skip_to_variable_name = variable.if_yes_skip_to
 
         if variable.if_no_skip_to and context[variable.name] is False:
             skip_to_variable_name = variable.if_no_skip_to
 
-    if skip_to_variable_name:
-        logger.warning(
-            f"Processed all variables, but skip_to_variable_name "
-            f"'{skip_to_variable_name}' was never found."
-        )
+        if skip_to_variable_name:
+            # only forward skips are possible: the first occurrence of the
+            # name after the current variable is the target
+            indices = name_to_indices.get(skip_to_variable_name, [])
+            position = bisect.bisect_left(indices, index)
+            if position == len(indices):
+                logger.warning(
+                    f"skip_to_variable_name '{skip_to_variable_name}' was not "
+                    f"found after variable '{variable.name}', "
+                    f"skipping all remaining variables."
+                )
+                break
+            index = indices[position]
 
     # TODO: here we match the v2 context to the v1 conventions for Jinja env variables
     #  if this PR goes through, next step is to refactor the whole context
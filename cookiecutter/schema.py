@@ -109,6 +109,7 @@ schema_2_0 = {
                                         "debug",
                                         "ignorecase",
                                         "locale",
+                                        "multiline",
                                         "mulitline",
                                         "dotall",
                                         "verbose",
@@ -8,9 +8,11 @@ Tests for `cookiecutter.context` module that handles prompts for v2 context.
 """
 from __future__ import unicode_literals
 
+import datetime
 import json
 import logging
 import os.path
+import re
 import sys
 import time
 from collections import OrderedDict
@@ -18,6 +20,7 @@ from uuid import UUID
 
 import click
 import pytest
+from jsonschema import ValidationError
 
 from cookiecutter import context
 from cookiecutter.context import validate_requirement
@@ -195,11 +198,202 @@ def test_load_context_defaults_skips_unknown_variable_name_warning(caplog):
         assert record.levelname == 'WARNING'
 
     assert (
-        "Processed all variables, but skip_to_variable_name "
-        "'this_variable_name_is_not_in_the_list' was never found." in caplog.text
+        "skip_to_variable_name 'this_variable_name_is_not_in_the_list' was not "
+        "found after variable 'project_uses_existing_logging_facilities', "
+        "skipping all remaining variables." in caplog.text
     )
 
 
+def skip_to_template(*variables):
+    return {
+        'version': '2.0',
+        'template': {
+            'name': 'cookiecutter-testing-skip-to',
+            'variables': list(variables),
+        },
+    }
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_skip_to_jumps_forward():
+    """
+    Test that a skip_to directive skips all the variables in between.
+    """
+    json_object = skip_to_template(
+        {'name': 'q', 'type': 'yes_no', 'default': True, 'if_yes_skip_to': 'c'},
+        {'name': 'a', 'type': 'string', 'default': 'x'},
+        {'name': 'b', 'type': 'string', 'default': 'x'},
+        {'name': 'c', 'type': 'string', 'default': 'y'},
+        {'name': 'd', 'type': 'string', 'default': 'z'},
+    )
+
+    cc_cfg = context.load_context(json_object, no_input=True, verbose=False)
+
+    assert cc_cfg == {'q': True, 'c': 'y', 'd': 'z'}
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_skip_to_duplicated_name():
+    """
+    Test that a skip_to directive jumps to the next variable with that name,
+    even if the same name was used before.
+    """
+    json_object = skip_to_template(
+        {'name': 'a', 'type': 'string', 'default': 'x'},
+        {'name': 'q', 'type': 'yes_no', 'default': True, 'if_yes_skip_to': 'a'},
+        {'name': 'mid', 'type': 'string', 'default': 'm'},
+        {'name': 'a', 'type': 'string', 'default': 'y'},
+    )
+
+    cc_cfg = context.load_context(json_object, no_input=True, verbose=False)
+
+    assert cc_cfg == {'a': 'y', 'q': True}
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_skip_to_backward_warning(caplog):
+    """
+    Test that a skip_to directive pointing backwards skips all remaining
+    variables with a warning.
+    """
+    json_object = skip_to_template(
+        {'name': 'a', 'type': 'string', 'default': 'x'},
+        {'name': 'q', 'type': 'yes_no', 'default': True, 'if_yes_skip_to': 'a'},
+        {'name': 'b', 'type': 'string', 'default': 'y'},
+    )
+
+    cc_cfg = context.load_context(json_object, no_input=True, verbose=False)
+
+    assert cc_cfg == {'a': 'x', 'q': True}
+    assert (
+        "skip_to_variable_name 'a' was not found after variable 'q', "
+        "skipping all remaining variables." in caplog.text
+    )
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_literal_conditions():
+    """
+    Test that skip_if and do_if also work with literal (non jinja) values.
+    """
+    cc = load_cookiecutter('tests/test-context/cookiecutter_literal_conditions.json')
+
+    cc_cfg = context.load_context(
+        cc['cookiecutter_literal_conditions'], no_input=True, verbose=False
+    )
+
+    assert cc_cfg == {'kept_by_skip_if': 'kept', 'kept_by_do_if': 'kept'}
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_literal_defaults_with_newlines():
+    """
+    Test that literal defaults get the same newline handling as jinja applies
+    to rendered ones.
+    """
+    json_object = {
+        'version': '2.0',
+        'template': {
+            'name': 'cookiecutter-testing-literal-newlines',
+            'variables': [
+                {'name': 'trailing', 'type': 'string', 'default': 'lit\n'},
+                {'name': 'crlf', 'type': 'string', 'default': 'a\r\nb'},
+                {'name': 'rendered', 'type': 'string', 'default': '{{ "lit" }}\n'},
+            ],
+        },
+    }
+
+    cc_cfg = context.load_context(json_object, no_input=True, verbose=False)
+
+    assert cc_cfg == {'trailing': 'lit', 'crlf': 'a\nb', 'rendered': 'lit'}
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_validates_schema_once(monkeypatch, mocker):
+    """
+    Test that the same template content is only validated against the schema
+    once, even if it is loaded several times.
+    """
+    monkeypatch.setattr(context, '_validated_contexts', {})
+    validate = mocker.patch(
+        'cookiecutter.context.validate', autospec=True, wraps=context.validate
+    )
+    cc = load_cookiecutter('tests/test-context/cookiecutter_literal_conditions.json')
+
+    for _ in range(2):
+        context.load_context(
+            cc['cookiecutter_literal_conditions'], no_input=True, verbose=False
+        )
+
+    assert validate.call_count == 1
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_validated_schemas_are_bounded(monkeypatch):
+    """
+    Test that only a limited number of validated templates are remembered.
+    """
+    monkeypatch.setattr(context, '_validated_contexts', {})
+    monkeypatch.setattr(context, '_VALIDATED_CONTEXTS_MAXSIZE', 2)
+    cc = load_cookiecutter('tests/test-context/cookiecutter_literal_conditions.json')
+    template = cc['cookiecutter_literal_conditions']['template']
+
+    for name in ('first', 'second', 'third'):
+        template['name'] = name
+        context.load_context(
+            cc['cookiecutter_literal_conditions'], no_input=True, verbose=False
+        )
+
+    assert len(context._validated_contexts) == 2
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_non_json_default():
+    """
+    Test that defaults injected from Python, which can't be serialized to
+    JSON, are still accepted.
+    """
+    json_object = {
+        'version': '2.0',
+        'template': {
+            'name': 'cookiecutter-testing-non-json-default',
+            'variables': [
+                {'name': 'd', 'type': 'string', 'default': datetime.date(2020, 1, 1)}
+            ],
+        },
+    }
+
+    cc_cfg = context.load_context(json_object, no_input=True, verbose=False)
+
+    assert cc_cfg == {'d': '2020-01-01'}
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_load_context_rejects_json_twin_of_validated_template(monkeypatch):
+    """
+    Test that a template the schema rejects is still rejected after a template
+    which dumps to the same JSON passed validation.
+    """
+    monkeypatch.setattr(context, '_validated_contexts', {})
+
+    def template(choices):
+        return {
+            'version': '2.0',
+            'template': {
+                'name': 'cookiecutter-testing-json-twin',
+                'variables': [
+                    {'name': 'c', 'type': 'string', 'default': 'x', 'choices': choices}
+                ],
+            },
+        }
+
+    cc_cfg = context.load_context(template(['x', 'y']), no_input=True, verbose=False)
+    assert cc_cfg == {'c': 'x'}
+
+    with pytest.raises(ValidationError):
+        context.load_context(template(('x', 'y')), no_input=True, verbose=False)
+
+
 def test_prompt_string(mocker):
 
     expected_value = 'Input String'
@@ -241,7 +435,11 @@ def test_prompt_bool(mocker):
     m = mocker.Mock()
     m.side_effect = context.Variable
     v = m.side_effect(
-        name='flag', type='bool', default=False, prompt='Enter a Flag', hide_input=False
+        name='flag',
+        type='boolean',
+        default=False,
+        prompt='Enter a Flag',
+        hide_input=False,
     )
 
     r = context.prompt_boolean(v, default=False)
@@ -508,6 +706,22 @@ def test_prompt_choice(mocker):
     assert r == expected_license
 
 
+def test_prompt_choice_unhashable_choices(mocker):
+    mock_prompt = mocker.patch(
+        'cookiecutter.prompt.click.prompt',
+        autospec=True,
+        return_value='2',
+    )
+    v = context.Variable(
+        'config', type='json', default={'a': 1}, choices=[{'a': 1}, {'b': 2}]
+    )
+
+    r = context.prompt_choice(v, default={'a': 1})
+
+    assert mock_prompt.call_args.kwargs['default'] == '1'
+    assert r == {'b': 2}
+
+
 def test_variable_invalid_default_choice():
     choices = ['green', 'red', 'blue', 'yellow']
     with pytest.raises(InvalidConfiguration) as excinfo:
@@ -520,6 +734,12 @@ def test_variable_invalid_default_choice():
     )
 
 
+def test_variable_invalid_type():
+    with pytest.raises(InvalidConfiguration) as excinfo:
+        context.Variable(name='badtype', type='complex')
+    assert "Variable: badtype has an unsupported type 'complex'" in str(excinfo.value)
+
+
 def test_variable_validation_compile_exception():
 
     var_name = 'module_name'
@@ -543,6 +763,33 @@ def test_variable_validation_compile_exception():
     )
 
 
+def test_variable_validation_compiled_pattern_is_cached():
+    context._compile_validation.cache_clear()
+
+    for name in ('module_name', 'package_name'):
+        context.Variable(
+            name,
+            type='string',
+            validation='^[a-z_]+$',
+            validation_flags=['ascii'],
+        )
+
+    cache_info = context._compile_validation.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 1
+
+
+def test_variable_validation_flags_combined():
+    v = context.Variable(
+        'module_name',
+        type='string',
+        validation='^[a-z_]+$',
+        validation_flags=['ignorecase', 'multiline', 'mulitline'],
+    )
+
+    assert v.validation_flags == re.IGNORECASE | re.MULTILINE
+
+
 def test_variable_validation_bad_type():
 
     bad_type = 'int'
@@ -573,6 +820,12 @@ def test_variable_defaults_to_no_prompt_for_private_variable_names():
     assert v.prompt_user is False
 
 
+def test_variable_default_prompt():
+    v = context.Variable('module_name', type='string')
+
+    assert v.prompt == 'Please enter a value for "module_name"'
+
+
 def test_variable_repr():
 
     v = context.Variable(
@@ -614,6 +867,15 @@ def test_variable_str():
     assert "validation_flag_names='['ignorecase']'" in v_str
     assert ("validation_flags='2'" in v_str) | (".IGNORECASE" in v_str)
 
+    assert "_prompt_fn" not in v_str
+    assert "_deserialize_fn" not in v_str
+
+    choice_str = str(
+        context.Variable('license', type='string', choices=['MIT', 'BSD3'])
+    )
+    assert "choices='['MIT', 'BSD3']'" in choice_str
+    assert "_choice_" not in choice_str
+
     if sys.version_info >= (3, 4):
         assert "validate='re.compile('^[a-z_]+$', re.IGNORECASE)'" in v_str
     else:
@@ -668,6 +930,21 @@ def test_load_context_with_input_with_validation_success(mocker):
     assert cc_cfg['module_name'] == 'image_module_maker'
 
 
+def test_prompt_variable_validation_matches_whole_input(mocker, capsys):
+    mocker.patch(
+        'click.termui.visible_prompt_func',
+        autospec=True,
+        side_effect=['debug shell', 'debug_shell'],
+    )
+    v = context.Variable('module_name', type='string', validation='[a-z_]+')
+
+    r = context.prompt_variable(v, verbose=False)
+
+    out, err = capsys.readouterr()
+    assert "Input validation failure against regex: '[a-z_]+', try again!" in out
+    assert r == 'debug_shell'
+
+
 def test_load_context_with_input_with_validation_failure(mocker, capsys):
     cc = load_cookiecutter('tests/test-context/cookiecutter_val_failure.json')
 